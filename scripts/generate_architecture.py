@@ -14,10 +14,89 @@ rounded-corner nodes, green/amber borders) and has clickable nodes that open
 the corresponding line in app.bicep on GitHub.
 """
 
+import functools
 import json
+import mmap
 import re
 import os
 import sys
+from dataclasses import asdict, dataclass
+
+
+# Patterns used while parsing Bicep source and `rad app graph` output.
+# Compiled once at import time rather than per resource / per connection.
+
+# --- Bicep resource blocks (parse_bicep) ---
+# A top-level `resource <name> '<type>' = {` declaration (not commented out)
+_RESOURCE_DECL_RE = re.compile(r"^[ \t]*resource\s+(\w+)\s+'([^']+)'\s*=\s*\{", re.MULTILINE)
+# Tokens relevant to brace matching; comments and strings (including
+# '''...''' multi-line strings) match as a whole
+_BRACE_TOKEN_RE = re.compile(r"//[^\n]*|/\*.*?\*/|'''.*?'''|'(?:[^'\\\n]|\\.)*'|[{}]", re.DOTALL)
+# All scalar properties of a resource body in one alternation; the named
+# group that matched (`m.lastgroup`) says which property was found.
+_INNER_RE = re.compile(
+    r"name:\s*'(?P<name>[^']+)'"
+    r"|image:\s*'(?P<image>[^']+)'"
+    r"|containerPort:\s*(?P<port>\d+)"
+    r"|source:\s*'(?P<src>[^']+)'"
+    r"|source:\s*(?P<ref>\w+)\.(?:id|connectionString)"
+)
+_CONN_RE = re.compile(r"connections:\s*\{(.*?)\n\s*\}", re.DOTALL)
+
+# --- Connection targets (both parsers) ---
+_URL_HOST_RE = re.compile(r"https?://([^:/]+)")
+_ARM_REF_RE = re.compile(r"\[reference\('(\w+)'\)")
+
+# --- Image parameter index (_load_bicep_param_index) ---
+_PARAM_RE = re.compile(r"param\s+(\w+)\s+string\s*=\s*'([^']+)'", re.MULTILINE)
+_RESOURCE_HEADER_RE = re.compile(r"resource\s+(\w+)\s+'[^']+'")
+_DISPLAY_NAME_RE = re.compile(r"name:\s*'([^']+)'")
+_IMAGE_PARAM_RE = re.compile(r"image:\s*(\w+)")
+
+# README "## Architecture" heading plus its body, up to the next "## "
+# heading (group 2) or the end of the file
+_ARCH_SECTION_RE = re.compile(r"(## Architecture\s*\n).*?(\n## |\Z)", re.DOTALL)
+
+
+# Resource type substring -> diagram category, checked in order. Containers
+# come first so "applications" only matches the top-level application.
+# Keep in step with graph_diff.categorize.
+_CATEGORY_RULES = (
+    ("containers", "container"),
+    ("rediscaches", "datastore"),
+    ("sqldatabases", "datastore"),
+    ("mongodatabases", "datastore"),
+    ("applications", "application"),
+)
+
+
+def _categorize(resource_type: str) -> str:
+    """Map a resource type to its diagram category."""
+    t = resource_type.lower()
+    for substring, category in _CATEGORY_RULES:
+        if substring in t:
+            return category
+    return "other"
+
+
+@dataclass(slots=True)
+class Resource:
+    """A diagram node parsed from Bicep or `rad app graph` output."""
+    symbolic_name: str
+    display_name: str
+    resource_type: str
+    image: str | None
+    port: str | None
+    category: str
+    line_number: int = 0
+    source_file: str = ""  # only known from `rad app graph` output
+
+
+@dataclass(slots=True, frozen=True)
+class Connection:
+    """A directed edge between two resources, by symbolic name."""
+    source: str
+    target: str
 
 
 def is_detailed_mode() -> bool:
@@ -25,6 +104,11 @@ def is_detailed_mode() -> bool:
     return os.environ.get("DETAILED", "false").lower() in ("true", "1", "yes")
 
 
+def _resource_label(resource: dict) -> str:
+    """Return the name to show for a resource."""
+    return resource.get("display_name") or resource.get("symbolic_name") or resource.get("name", "unknown")
+
+
 def resolve_image_tag(resource: dict, bicep_path: str | None = None) -> tuple[str, str] | None:
     """Resolve image and tag for a resource.
 
@@ -46,8 +130,7 @@ def resolve_image_tag(resource: dict, bicep_path: str | None = None) -> tuple[st
 
     if not image_str:
         # Fallback: use resource name
-        name = resource.get("display_name") or resource.get("symbolic_name") or resource.get("name", "unknown")
-        return (name, "latest")
+        return (_resource_label(resource), "latest")
 
     # Split on last colon to separate image from tag
     if ":" in image_str:
@@ -57,160 +140,241 @@ def resolve_image_tag(resource: dict, bicep_path: str | None = None) -> tuple[st
         return (image_str, "latest")
 
 
+@functools.lru_cache(maxsize=8)
+def _load_bicep_param_index(bicep_path: str) -> tuple[dict, dict, dict]:
+    """Index a Bicep file for image parameter lookups.
+
+    Returns (param_defaults, symbol_to_param, display_to_param), built from a
+    single read of the file.
+    """
+    with open(bicep_path, "r") as f:
+        bicep_content = f.read()
+
+    # Find all param declarations with string defaults that look like images
+    # e.g.: param magpieimage string = 'ghcr.io/image-registry/magpie:latest'
+    param_defaults = {m.group(1): m.group(2) for m in _PARAM_RE.finditer(bicep_content)}
+
+    # For each resource <name> ..., the first `image: <paramName>` after it
+    symbol_to_param = {}
+    for m in _RESOURCE_HEADER_RE.finditer(bicep_content):
+        if m.group(1) not in symbol_to_param:
+            image_match = _IMAGE_PARAM_RE.search(bicep_content, m.end() + 1)
+            if image_match:
+                symbol_to_param[m.group(1)] = image_match.group(1)
+
+    # Same, keyed by the resource's `name: '<display name>'`
+    display_to_param = {}
+    for m in _DISPLAY_NAME_RE.finditer(bicep_content):
+        if m.group(1) not in display_to_param:
+            image_match = _IMAGE_PARAM_RE.search(bicep_content, m.end() + 1)
+            if image_match:
+                display_to_param[m.group(1)] = image_match.group(1)
+
+    return param_defaults, symbol_to_param, display_to_param
+
+
 def _resolve_param_image(resource: dict, bicep_path: str | None) -> str | None:
     """Try to resolve image from Bicep parameter defaults."""
     if not bicep_path or not os.path.exists(bicep_path):
         return None
 
     try:
-        with open(bicep_path, "r") as f:
-            bicep_content = f.read()
+        param_defaults, symbol_to_param, display_to_param = _load_bicep_param_index(bicep_path)
     except OSError:
         return None
 
-    # Find all param declarations with string defaults that look like images
-    # e.g.: param magpieimage string = 'ghcr.io/image-registry/magpie:latest'
-    param_pattern = re.compile(
-        r"param\s+(\w+)\s+string\s*=\s*'([^']+)'", re.MULTILINE
-    )
-    param_defaults = {m.group(1): m.group(2) for m in param_pattern.finditer(bicep_content)}
-
     # Now check if the resource's Bicep block references one of these params
     res_name = resource.get("symbolic_name") or resource.get("name", "")
-    # Search for: resource <name> ... image: <paramName>
-    res_block_pattern = re.compile(
-        r"resource\s+" + re.escape(res_name) + r"\s+'[^']+'.+?image:\s*(\w+)",
-        re.DOTALL,
-    )
-    m = res_block_pattern.search(bicep_content)
-    if m:
-        param_name = m.group(1)
-        if param_name in param_defaults:
-            return param_defaults[param_name]
+    param_name = symbol_to_param.get(res_name)
+    if param_name in param_defaults:
+        return param_defaults[param_name]
 
     # Also try matching by display_name
     display_name = resource.get("display_name", "")
     if display_name and display_name != res_name:
-        res_block_pattern2 = re.compile(
-            r"name:\s*'" + re.escape(display_name) + r"'.+?image:\s*(\w+)",
-            re.DOTALL,
-        )
-        m2 = res_block_pattern2.search(bicep_content)
-        if m2:
-            param_name = m2.group(1)
-            if param_name in param_defaults:
-                return param_defaults[param_name]
+        param_name = display_to_param.get(display_name)
+        if param_name in param_defaults:
+            return param_defaults[param_name]
 
     return None
 
 
 def make_detailed_label(resource: dict, bicep_path: str | None = None) -> str:
     """Build a detailed multi-line Mermaid label: name + image:tag."""
-    name = resource.get("display_name") or resource.get("symbolic_name") or resource.get("name", "unknown")
+    name = _resource_label(resource)
     result = resolve_image_tag(resource, bicep_path)
     if result:
         image, tag = result
-        return '<b>{}</b><br/><span style="color:#656d76">{}</span>'.format(
-            name, f"{image}:{tag}"
-        )
+        return f'<b>{name}</b><br/><span style="color:#656d76">{image}:{tag}</span>'
     return f"<b>{name}</b>"
 
 
+def _iter_resource_blocks(content):
+    """Yield (symbolic_name, resource_type, body, line_number) per resource.
+
+    Each block runs from its header's opening brace to the matching closing
+    brace, found by tracking brace depth in one forward scan. Braces inside
+    comments and string literals are ignored, and comments are left out of
+    the yielded body. A header whose block never closes is skipped. Line
+    numbers are counted incrementally between headers, so the file is only
+    traversed once.
+    """
+    pos = 0
+    line_number = 1
+    counted_to = 0
+    while True:
+        header = _RESOURCE_DECL_RE.search(content, pos)
+        if not header:
+            return
+        line_number += content.count("\n", counted_to, header.start())
+        counted_to = header.start()
+        depth = 1
+        pieces = []  # body text between comments
+        start = header.end()
+        for tok in _BRACE_TOKEN_RE.finditer(content, header.end()):
+            text = tok.group()
+            if text == "{":
+                depth += 1
+            elif text == "}":
+                depth -= 1
+                if depth == 0:
+                    pieces.append(content[start:tok.start()])
+                    yield (header.group(1), header.group(2),
+                           "".join(pieces), line_number)
+                    pos = tok.end()
+                    break
+            elif text[0] == "/":
+                pieces.append(content[start:tok.start()])
+                start = tok.end()
+        else:
+            pos = header.end()  # unterminated block: skip just this header
+
+
 def parse_bicep(bicep_path):
     """Parse a Bicep file and extract resources, connections, and line numbers."""
     with open(bicep_path, "r") as f:
         content = f.read()
 
     resources = []
-    connections = []
-
-    resource_pattern = re.compile(
-        r"resource\s+(\w+)\s+'([^']+)'\s*=\s*\{(.*?)\n\}",
-        re.DOTALL,
-    )
-
-    for match in resource_pattern.finditer(content):
-        symbolic_name = match.group(1)
-        resource_type = match.group(2)
-        body = match.group(3)
-
-        line_number = content[: match.start()].count("\n") + 1
-
-        name_match = re.search(r"name:\s*'([^']+)'", body)
-        display_name = name_match.group(1) if name_match else symbolic_name
-
-        image_match = re.search(r"image:\s*'([^']+)'", body)
-        image = image_match.group(1) if image_match else None
-
-        port_match = re.search(r"containerPort:\s*(\d+)", body)
-        port = port_match.group(1) if port_match else None
+    # (from, target, target_is_hostname) in source order; hostnames are
+    # resolved to symbolic names once every resource is known
+    pending_conns = []
+    seen_conns = set()  # (from, to) pairs already in pending_conns
+
+    for symbolic_name, resource_type, body, line_number in _iter_resource_blocks(content):
+
+        # Only `source: '<url>'` entries inside the connections block count
+        conn_match = _CONN_RE.search(body)
+        conn_start, conn_end = conn_match.span(1) if conn_match else (0, 0)
+
+        # Walk the body once, keeping the first name/image/port seen
+        display_name = image = port = None
+        source_urls = []
+        source_refs = []
+        for m in _INNER_RE.finditer(body):
+            kind = m.lastgroup
+            if kind == "name":
+                if display_name is None:
+                    display_name = m.group("name")
+            elif kind == "image":
+                if image is None:
+                    image = m.group("image")
+            elif kind == "port":
+                if port is None:
+                    port = m.group("port")
+            elif kind == "src":
+                if conn_start <= m.start() and m.end() <= conn_end:
+                    source_urls.append(m.group("src"))
+            else:
+                source_refs.append(m.group("ref"))
+
+        if display_name is None:
+            display_name = symbolic_name
+
+        category = _categorize(resource_type)
+
+        resources.append(Resource(
+            symbolic_name=symbolic_name,
+            display_name=display_name,
+            resource_type=resource_type,
+            image=image,
+            port=port,
+            category=category,
+            line_number=line_number,
+        ))
+
+        # Extract source URLs/refs from connection entries
+        for source_url in source_urls:
+            # source can be a URL like 'http://http-back-ctnr-simple1:3000'
+            # or a resource ref like 'backend.id'
+            url_match_inner = _URL_HOST_RE.match(source_url)
+            if url_match_inner:
+                target_hostname = url_match_inner.group(1)
+                pending_conns.append((symbolic_name, target_hostname, True))
+            else:
+                pending_conns.append((symbolic_name, source_url, False))
+                seen_conns.add((symbolic_name, source_url))
 
-        if "containers" in resource_type.lower():
-            category = "container"
-        elif "rediscaches" in resource_type.lower():
-            category = "datastore"
-        elif "sqldatabases" in resource_type.lower():
-            category = "datastore"
-        elif "mongodatabases" in resource_type.lower():
-            category = "datastore"
-        elif "applications" in resource_type.lower() and "containers" not in resource_type.lower():
-            category = "application"
-        else:
-            category = "other"
-
-        resources.append({
-            "symbolic_name": symbolic_name,
-            "display_name": display_name,
-            "resource_type": resource_type,
-            "image": image,
-            "port": port,
-            "category": category,
-            "line_number": line_number,
-        })
-
-        conn_pattern = re.compile(r"connections:\s*\{(.*?)\n\s*\}", re.DOTALL)
-        conn_match = conn_pattern.search(body)
-        if conn_match:
-            conn_body = conn_match.group(1)
-            # Extract source URLs/refs from connection entries
-            source_urls = re.findall(r"source:\s*'([^']+)'", conn_body)
-            for source_url in source_urls:
-                # source can be a URL like 'http://http-back-ctnr-simple1:3000'
-                # or a resource ref like 'backend.id'
-                url_match_inner = re.match(r"https?://([^:/]+)", source_url)
-                if url_match_inner:
-                    target_hostname = url_match_inner.group(1)
-                    connections.append({"from": symbolic_name, "to_hostname": target_hostname})
-                else:
-                    connections.append({"from": symbolic_name, "to": source_url})
-
-        source_refs = re.findall(r"source:\s*(\w+)\.(id|connectionString)", body)
-        for ref_name, _ in source_refs:
-            conn = {"from": symbolic_name, "to": ref_name}
-            if conn not in connections:
-                connections.append(conn)
+        for ref_name in source_refs:
+            key = (symbolic_name, ref_name)
+            if key not in seen_conns:
+                seen_conns.add(key)
+                pending_conns.append((symbolic_name, ref_name, False))
 
     # Resolve hostname-based connections to symbolic names
     # Build lookup: display_name (resource name) -> symbolic_name
-    name_to_symbolic = {r["display_name"]: r["symbolic_name"] for r in resources}
+    name_to_symbolic = {r.display_name: r.symbolic_name for r in resources}
 
     resolved_connections = []
-    for conn in connections:
-        if "to_hostname" in conn:
-            hostname = conn["to_hostname"]
+    for from_sym, target, is_hostname in pending_conns:
+        if is_hostname:
             # Match hostname against resource display names
-            target_sym = name_to_symbolic.get(hostname)
+            target_sym = name_to_symbolic.get(target)
             if target_sym:
-                resolved_connections.append({"from": conn["from"], "to": target_sym})
+                resolved_connections.append(Connection(from_sym, target_sym))
             else:
                 # Hostname didn't match any display name exactly; skip
-                print(f"  Warning: could not resolve connection target hostname '{hostname}'")
+                print(f"  Warning: could not resolve connection target hostname '{target}'")
         else:
-            resolved_connections.append(conn)
+            resolved_connections.append(Connection(from_sym, target))
 
     return resources, resolved_connections
 
 
+def _read_json_payload(output_path: str) -> bytes:
+    """Return the raw bytes of a `rad app graph` output file from the first '{'.
+
+    rad app graph may print status lines (e.g. "Building ...") before the
+    JSON. The file is memory-mapped so that prefix is skipped without first
+    reading, stripping and slicing the whole file as text.
+    """
+    with open(output_path, "rb") as f:
+        if not os.fstat(f.fileno()).st_size:
+            return b""  # mmap refuses empty files
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            json_start = m.find(b"{")
+            if json_start <= 0:
+                return m[:]
+            skipped = len(m[:json_start].lstrip())
+            if skipped:
+                print(f"Skipping {skipped} bytes of non-JSON prefix")
+            return m[json_start:]
+
+
+def _first_port(ports: dict) -> str | None:
+    """Return the first literal containerPort in a container's ports map."""
+    for port_entry in ports.values():
+        if isinstance(port_entry, dict):
+            cp = port_entry.get("containerPort")
+            if isinstance(cp, int):
+                if cp:
+                    return str(cp)
+            # Skip ARM template expressions like [parameters('port')]
+            elif isinstance(cp, str) and cp and not cp.startswith("["):
+                return cp
+    return None
+
+
 def parse_rad_graph_output(output_path):
     """Parse the output of `rad app graph` and extract resources and connections.
 
@@ -238,18 +402,11 @@ def parse_rad_graph_output(output_path):
 
     If the output is not valid JSON, fall back to line-based parsing.
     """
-    with open(output_path, "r") as f:
-        raw = f.read().strip()
-
-    # rad app graph may print status lines (e.g. "Building ...") before the JSON.
-    # Strip everything before the first '{' to get clean JSON.
-    json_start = raw.find("{")
-    if json_start > 0:
-        print(f"Skipping {json_start} bytes of non-JSON prefix")
-        raw = raw[json_start:]
+    raw = _read_json_payload(output_path)
 
     resources = []
     connections = []
+    seen_conns = set()  # Connections already in the list
 
     try:
         data = json.loads(raw)
@@ -287,39 +444,32 @@ def parse_rad_graph_output(output_path):
                 image = None
 
             # Extract port from nested properties.container.ports.*.containerPort
-            port = None
-            ports = container.get("ports", {})
-            for port_entry in ports.values():
-                if isinstance(port_entry, dict):
-                    cp = port_entry.get("containerPort")
-                    if cp and not str(cp).startswith("["):
-                        port = str(cp)
-                        break
-
-            # Categorize
-            if "containers" in res_type.lower():
-                category = "container"
-            elif "rediscaches" in res_type.lower() or "sqldatabases" in res_type.lower() or "mongodatabases" in res_type.lower():
-                category = "datastore"
-            elif "applications" in res_type.lower() and "containers" not in res_type.lower():
-                category = "application"
-            else:
-                category = "other"
-
-            resources.append({
-                "symbolic_name": name,
-                "display_name": name,
-                "resource_type": res_type,
-                "image": image,
-                "port": port,
-                "category": category,
-                "line_number": line_number,
-                "source_file": source_file,
-            })
+            port = _first_port(container.get("ports", {}))
+
+            category = _categorize(res_type)
+
+            resources.append(Resource(
+                symbolic_name=name,
+                display_name=name,
+                resource_type=res_type,
+                image=image,
+                port=port,
+                category=category,
+                line_number=line_number,
+                source_file=source_file,
+            ))
 
             if res_id:
                 id_to_name[res_id] = name
 
+        # Index ids by their final path segment (first resource wins) so the
+        # fallback lookups below are a dict probe rather than a scan.
+        last_segment_to_name = {}
+        for rid, rname in id_to_name.items():
+            if "/" in rid:
+                last_segment_to_name.setdefault(rid.rsplit("/", 1)[1], rname)
+        name_set = set(id_to_name.values())
+
         # Parse top-level connections array (new format from rad app graph)
         for conn in data.get("connections", []):
             source_id = conn.get("sourceId", "")
@@ -335,10 +485,7 @@ def parse_rad_graph_output(output_path):
             if not source_name:
                 # Try matching by the last segment of the id
                 source_last = source_id.rstrip("/").rsplit("/", 1)[-1] if "/" in source_id else source_id
-                for rid, rname in id_to_name.items():
-                    if rid.endswith("/" + source_last):
-                        source_name = rname
-                        break
+                source_name = last_segment_to_name.get(source_last, "")
 
             # Resolve targetId to resource name
             target_name = id_to_name.get(target_id, "")
@@ -346,25 +493,26 @@ def parse_rad_graph_output(output_path):
                 # ARM expression like [reference('database').id] — extract the
                 # symbolic name from the reference() call and match it to a
                 # known resource.
-                arm_ref_match = re.match(r"\[reference\('(\w+)'\)", target_id)
+                arm_ref_match = _ARM_REF_RE.match(target_id)
                 if arm_ref_match:
                     ref_sym = arm_ref_match.group(1)
                     # Match the symbolic name to any known resource name
-                    for rname in id_to_name.values():
-                        if rname == ref_sym:
-                            target_name = rname
-                            break
+                    if ref_sym in name_set:
+                        target_name = ref_sym
 
                 # targetId might be a URL like "http://backend:3000"
                 if not target_name:
-                    url_match = re.match(r"https?://([^:/]+)", target_id)
+                    url_match = _URL_HOST_RE.match(target_id)
                     if url_match:
                         hostname = url_match.group(1)
-                        # Match hostname to any resource name (may contain hostname as substring)
-                        for rname in id_to_name.values():
-                            if hostname in rname or rname in hostname:
-                                target_name = rname
-                                break
+                        if hostname in name_set:
+                            target_name = hostname
+                        else:
+                            # Match hostname to any resource name (may contain hostname as substring)
+                            for rname in id_to_name.values():
+                                if hostname in rname or rname in hostname:
+                                    target_name = rname
+                                    break
                         if not target_name:
                             # Use hostname itself as the target name
                             target_name = hostname
@@ -372,16 +520,14 @@ def parse_rad_graph_output(output_path):
                 # Plain name — try direct match
                 if not target_name:
                     target_last = target_id.rstrip("/").rsplit("/", 1)[-1] if "/" in target_id else target_id
-                    for rid, rname in id_to_name.items():
-                        if rid.endswith("/" + target_last) or rname == target_last:
-                            target_name = rname
-                            break
-                    if not target_name:
-                        target_name = target_last
+                    # Falls back to the segment itself, which also covers a
+                    # target that is already a bare resource name.
+                    target_name = last_segment_to_name.get(target_last) or target_last
 
             if source_name and target_name and source_name != target_name:
-                conn_entry = {"from": source_name, "to": target_name}
-                if conn_entry not in connections:
+                conn_entry = Connection(source_name, target_name)
+                if conn_entry not in seen_conns:
+                    seen_conns.add(conn_entry)
                     connections.append(conn_entry)
 
         print(f"Parsed rad app graph output: {len(resources)} resources, {len(connections)} connections")
@@ -390,16 +536,42 @@ def parse_rad_graph_output(output_path):
     except (json.JSONDecodeError, KeyError) as e:
         print(f"Warning: Could not parse rad app graph output as JSON ({e})")
         print("Raw output:")
-        print(raw[:500])
+        print(raw.strip()[:500].decode("utf-8", "replace"))
         print("\nFalling back to direct Bicep parsing...")
         return None, None, None
 
     return resources, connections, bicep_filename
 
 
-def get_github_file_url(repo_owner, repo_name, branch, file_path, line):
-    """Build a GitHub URL that highlights a specific line."""
-    return f"https://github.com/{repo_owner}/{repo_name}/blob/{branch}/{file_path}#L{line}"
+# Fixed preamble of every generated diagram.
+_MERMAID_HEADER = (
+    # --- GitHub light theme styling ---
+    # Matches GitHub's own dependency/action graph look:
+    # white background, light gray borders, clean rounded-corner boxes
+    "%%{ init: { 'theme': 'base', 'themeVariables': { "
+    "'primaryColor': '#ffffff', "
+    "'primaryTextColor': '#1f2328', "
+    "'primaryBorderColor': '#d1d9e0', "
+    "'lineColor': '#2da44e', "
+    "'secondaryColor': '#f6f8fa', "
+    "'tertiaryColor': '#ffffff', "
+    "'background': '#ffffff', "
+    "'mainBkg': '#ffffff', "
+    "'nodeBorder': '#d1d9e0', "
+    "'clusterBkg': '#f6f8fa', "
+    "'clusterBorder': '#d1d9e0', "
+    "'fontSize': '14px', "
+    "'fontFamily': '-apple-system, BlinkMacSystemFont, Segoe UI, Noto Sans, Helvetica, Arial, sans-serif'"
+    " } } }%%",
+    "graph LR",
+    # Class definitions — GitHub light palette with rounded corners
+    # Container: blue accent (like GitHub's blue links/actions)
+    "    classDef container fill:#ffffff,stroke:#2da44e,stroke-width:1.5px,color:#1f2328,rx:6,ry:6",
+    # Datastore: orange accent (like GitHub's warning/merge colors)
+    "    classDef datastore fill:#ffffff,stroke:#d4a72c,stroke-width:1.5px,color:#1f2328,rx:6,ry:6",
+    # Other: neutral gray
+    "    classDef other fill:#ffffff,stroke:#d1d9e0,stroke-width:1.5px,color:#1f2328,rx:6,ry:6",
+)
 
 
 def generate_mermaid(resources, connections, repo_owner, repo_name, branch, bicep_file,
@@ -409,85 +581,56 @@ def generate_mermaid(resources, connections, repo_owner, repo_name, branch, bice
     When detailed=True, container nodes show image:tag metadata.
     """
 
-    lines = ["graph LR"]
+    lines = list(_MERMAID_HEADER)
 
-    # --- GitHub light theme styling ---
-    # Matches GitHub's own dependency/action graph look:
-    # white background, light gray borders, clean rounded-corner boxes
-    lines.insert(0, "%%{ init: { 'theme': 'base', 'themeVariables': { "
-                     "'primaryColor': '#ffffff', "
-                     "'primaryTextColor': '#1f2328', "
-                     "'primaryBorderColor': '#d1d9e0', "
-                     "'lineColor': '#2da44e', "
-                     "'secondaryColor': '#f6f8fa', "
-                     "'tertiaryColor': '#ffffff', "
-                     "'background': '#ffffff', "
-                     "'mainBkg': '#ffffff', "
-                     "'nodeBorder': '#d1d9e0', "
-                     "'clusterBkg': '#f6f8fa', "
-                     "'clusterBorder': '#d1d9e0', "
-                     "'fontSize': '14px', "
-                     "'fontFamily': '-apple-system, BlinkMacSystemFont, Segoe UI, Noto Sans, Helvetica, Arial, sans-serif'"
-                     " } } }%%")
-
-    # Class definitions — GitHub light palette with rounded corners
-    # Container: blue accent (like GitHub's blue links/actions)
-    lines.append("    classDef container fill:#ffffff,stroke:#2da44e,stroke-width:1.5px,color:#1f2328,rx:6,ry:6")
-    # Datastore: orange accent (like GitHub's warning/merge colors)
-    lines.append("    classDef datastore fill:#ffffff,stroke:#d4a72c,stroke-width:1.5px,color:#1f2328,rx:6,ry:6")
-    # Other: neutral gray
-    lines.append("    classDef other fill:#ffffff,stroke:#d1d9e0,stroke-width:1.5px,color:#1f2328,rx:6,ry:6")
-
-    resource_map = {r["symbolic_name"]: r for r in resources}
+    by_sym = {r.symbolic_name: r for r in resources}
 
     # Add nodes (skip the top-level application resource)
     # Use regular box nodes [" "] — rounded corners come from rx/ry in classDef
-    for res in resources:
-        if res["category"] == "application":
+    for r in resources:
+        if r.category == "application":
             continue
 
         if detailed:
-            label = make_detailed_label(res, bicep_path)
+            # The label helpers take plain dicts (graph_diff builds its own)
+            label = make_detailed_label(asdict(r), bicep_path)
         else:
             # Standard label — clean, no line numbers (those go in tooltip only)
-            label_parts = ["<b>" + res["display_name"] + "</b>"]
-            if res["image"]:
-                label_parts.append(res["image"])
-            if res["port"]:
-                label_parts.append(":" + res["port"])
+            label_parts = ["<b>" + r.display_name + "</b>"]
+            if r.image:
+                label_parts.append(r.image)
+            if r.port:
+                label_parts.append(":" + r.port)
             label = "<br/>".join(label_parts)
 
-        lines.append('    {}["{}"]:::{}'.format(res["symbolic_name"], label, res["category"]))
+        lines.append(f'    {r.symbolic_name}["{label}"]:::{r.category}')
 
-    # Add edges — clean arrow style
+    # Add edges — clean arrow style. Each edge's linkStyle line is built in
+    # the same pass and emitted after the click directives.
+    link_styles = []
     for conn in connections:
-        if conn["from"] in resource_map and conn["to"] in resource_map:
-            from_res = resource_map[conn["from"]]
-            to_res = resource_map[conn["to"]]
-            if from_res["category"] == "application" or to_res["category"] == "application":
-                continue
-            lines.append("    {} --> {}".format(conn["from"], conn["to"]))
+        src = by_sym.get(conn.source)
+        tgt = by_sym.get(conn.target)
+        if src is None or tgt is None:
+            continue
+        if src.category == "application" or tgt.category == "application":
+            continue
+        lines.append(f"    {conn.source} --> {conn.target}")
+        # Link style — GitHub gray, clean
+        link_styles.append(f"    linkStyle {len(link_styles)} stroke:#2da44e,stroke-width:1.5px")
 
     # Add click directives — tooltip shows source file:line, click opens GitHub
-    for res in resources:
-        if res["category"] == "application":
+    url_prefix = f"https://github.com/{repo_owner}/{repo_name}/blob/{branch}/"
+    for r in resources:
+        if r.category == "application":
             continue
         # Use per-resource source_file if available, otherwise fall back to bicep_file
-        res_file = res.get("source_file") or bicep_file
-        url = get_github_file_url(repo_owner, repo_name, branch, res_file, res["line_number"])
-        tooltip = "{}:{}" .format(res_file, res["line_number"])
-        lines.append('    click {} href "{}" "{}" _blank'.format(res["symbolic_name"], url, tooltip))
+        res_file = r.source_file or bicep_file
+        url = f"{url_prefix}{res_file}#L{r.line_number}"
+        tooltip = f"{res_file}:{r.line_number}"
+        lines.append(f'    click {r.symbolic_name} href "{url}" "{tooltip}" _blank')
 
-    # Link style — GitHub gray, clean
-    edge_count = 0
-    for conn in connections:
-        if conn["from"] in resource_map and conn["to"] in resource_map:
-            from_res = resource_map[conn["from"]]
-            to_res = resource_map[conn["to"]]
-            if from_res["category"] == "application" or to_res["category"] == "application":
-                continue
-            lines.append("    linkStyle {} stroke:#2da44e,stroke-width:1.5px".format(edge_count))
-            edge_count += 1
+    lines.extend(link_styles)
 
     return "\n".join(lines)
 
@@ -509,18 +652,23 @@ def update_readme(readme_path, mermaid_block):
     ])
 
     # Replace the Architecture section content
-    pattern = re.compile(
-        r"(## Architecture\s*\n).*?(\n## |\Z)",
-        re.DOTALL,
-    )
-
-    if pattern.search(content):
-        new_content = pattern.sub(r"\1" + new_body + "\n" + r"\2", content)
+    match = _ARCH_SECTION_RE.search(content)
+    if match:
+        # Leave the file (and its mtime) alone when the section already
+        # holds this exact diagram
+        if new_body.strip() in match.group(0):
+            print("README.md unchanged")
+            return
+        new_content = _ARCH_SECTION_RE.sub(r"\1" + new_body + "\n" + r"\2", content)
     else:
         new_content = content + "\n## Architecture\n" + new_body + "\n"
 
-    with open(readme_path, "w") as f:
+    # Write a sibling temp file and swap it in, so an interrupted run never
+    # leaves a half-written README behind
+    tmp_path = readme_path + ".tmp"
+    with open(tmp_path, "w", buffering=1 << 20) as f:
         f.write(new_content)
+    os.replace(tmp_path, readme_path)
 
     print("README.md updated")
 
@@ -567,9 +715,9 @@ def main():
 
     print(f"Found {len(resources)} resources and {len(connections)} connections")
     for r in resources:
-        print("  - {} ({}) @ line {}".format(r["display_name"], r["category"], r["line_number"]))
+        print(f"  - {r.display_name} ({r.category}) @ line {r.line_number}")
     for c in connections:
-        print("  - {} -> {}".format(c["from"], c["to"]))
+        print(f"  - {c.source} -> {c.target}")
 
     print("\nGenerating Mermaid diagram...")
     mermaid_block = generate_mermaid(
@@ -25,45 +25,107 @@ Environment variables:
     REPO_NAME    — repository name (e.g. "prototype").
 """
 
+import atexit
+import functools
 import hashlib
+import io
 import json
 import os
 import re
 import subprocess
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-# Import detailed-mode helpers from our sibling module
+# Detailed-mode helpers come from our sibling module, imported on first use
+# so the default (non-detailed) run never loads it
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from generate_architecture import (
-    is_detailed_mode,
-    make_detailed_label,
-    resolve_image_tag,
-    _resolve_param_image,
-)
+
+# ARM expression like [reference('database').id]
+_ARM_RE = re.compile(r"\[reference\('(\w+)'\)")
+# URL like http://backend:3000
+_URL_RE = re.compile(r"https?://([^:/]+)")
 
 
 # ── helpers ──────────────────────────────────────────────────────────
 
-def git_show(sha: str, path: str) -> str | None:
-    """Return file contents at a given commit, or None if missing."""
-    try:
-        result = subprocess.run(
-            ["git", "show", f"{sha}:{path}"],
-            capture_output=True, text=True, check=True,
+class _CatFile:
+    """A long-running `git cat-file --batch` process for reading blobs.
+
+    One process serves every lookup, instead of forking `git show` each time.
+    """
+
+    def __init__(self):
+        self._proc = subprocess.Popen(
+            ["git", "cat-file", "--batch"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
         )
-        return result.stdout
-    except subprocess.CalledProcessError:
+        atexit.register(self.close)
+
+    def read(self, rev: str) -> bytes | None:
+        """Return the blob named by rev (e.g. "<sha>:<path>"), or None if missing."""
+        try:
+            self._proc.stdin.write(rev.encode() + b"\n")
+            self._proc.stdin.flush()
+        except (BrokenPipeError, OSError):
+            return None
+        header = self._proc.stdout.readline()
+        # "<oid> <type> <size>", or "<rev> missing" / "<rev> ambiguous"
+        parts = header.split()
+        if len(parts) != 3 or not parts[2].isdigit():
+            return None
+        _, obj_type, size = parts
+        data = self._proc.stdout.read(int(size) + 1)[:-1]  # drop trailing LF
+        return data if obj_type == b"blob" else None
+
+    def close(self):
+        if self._proc.poll() is None:
+            self._proc.stdin.close()
+            self._proc.wait()
+
+
+_local = threading.local()
+
+
+def read_head_graph(path: str) -> bytes | None:
+    """Return the head graph file contents, or None if unset or missing."""
+    if not path:
+        return None
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        print(f"Warning: HEAD_GRAPH file not found: {path}", file=sys.stderr)
         return None
 
 
-def parse_graph(raw: str | None) -> dict:
+def is_detailed_mode() -> bool:
+    """Check if detailed mode is enabled via the DETAILED env var."""
+    # Must stay in step with generate_architecture.is_detailed_mode, which is
+    # not imported here so non-detailed runs never load that module
+    return os.environ.get("DETAILED", "false").lower() in ("true", "1", "yes")
+
+
+def git_show(sha: str, path: str) -> bytes | None:
+    """Return file contents at a given commit, or None if missing."""
+    cat_file = getattr(_local, "cat_file", None)
+    if cat_file is None:
+        cat_file = _local.cat_file = _CatFile()
+    return cat_file.read(f"{sha}:{path}")
+
+
+def parse_graph(raw: bytes | None) -> dict:
     """Parse app-graph JSON into a normalised dict."""
     if not raw:
         return {"resources": {}, "connections": []}
+    # json.loads detects UTF-8 bytes itself, so no separate decode pass
     data = json.loads(raw)
     resources = {}
     for r in data.get("resources", []):
         resources[r.get("id", r.get("name", ""))] = r
+        # Derived once here; the renderers look these up per node and edge
+        r["_cat"] = categorize(r.get("type", ""))
+        r["_nid"] = safe_node_id(r.get("name", "unknown"))
     connections = []
     for c in data.get("connections", []):
         if c.get("type") != "dependsOn":
@@ -75,22 +137,14 @@ def resolve_name(res_id: str, resources: dict) -> str:
     """Get a short display name from a resource id or target string."""
     if res_id in resources:
         return resources[res_id].get("name", res_id)
-    # ARM expression like [reference('database').id]
-    arm_match = re.match(r"\[reference\('(\w+)'\)", res_id)
+    # The symbol or hostname is the display name whether or not a resource
+    # carries it, so no scan over resources is needed
+    arm_match = _ARM_RE.match(res_id)
     if arm_match:
-        sym = arm_match.group(1)
-        for r in resources.values():
-            if r.get("name") == sym:
-                return sym
-        return sym
-    # URL like http://backend:3000
-    url_match = re.match(r"https?://([^:/]+)", res_id)
+        return arm_match.group(1)
+    url_match = _URL_RE.match(res_id)
     if url_match:
-        hostname = url_match.group(1)
-        for r in resources.values():
-            if r.get("name") == hostname:
-                return hostname
-        return hostname
+        return url_match.group(1)
     # Last path segment
     return res_id.rstrip("/").rsplit("/", 1)[-1]
 
@@ -119,6 +173,8 @@ def resource_label(res: dict, repo_owner: str = "", repo_name: str = "", pr_numb
 
 def categorize(res_type: str) -> str:
     """Categorize a resource type."""
+    # Same substring rules as generate_architecture._categorize, so the README
+    # diagram and the PR diff diagram agree
     t = res_type.lower()
     if "containers" in t:
         return "container"
@@ -138,19 +194,21 @@ def safe_node_id(name: str) -> str:
 
 def diff_graphs(base: dict, head: dict) -> dict:
     """Compute added / removed / modified resources and connections."""
-    base_ids = set(base["resources"])
-    head_ids = set(head["resources"])
-
-    added = head_ids - base_ids
-    removed = base_ids - head_ids
-    common = base_ids & head_ids
-
-    modified = set()
-    for rid in common:
-        if json.dumps(base["resources"][rid], sort_keys=True) != json.dumps(
-            head["resources"][rid], sort_keys=True
-        ):
+    base_res = base["resources"]
+    head_res = head["resources"]
+
+    # One pass over head classifies every id it holds; plain dict equality is
+    # key-order independent and stops at the first difference, without
+    # serialising either side
+    added, modified, unchanged = set(), set(), set()
+    for rid, res in head_res.items():
+        if rid not in base_res:
+            added.add(rid)
+        elif base_res[rid] != res:
             modified.add(rid)
+        else:
+            unchanged.add(rid)
+    removed = base_res.keys() - head_res.keys()
 
     base_conns = set(base["connections"])
     head_conns = set(head["connections"])
@@ -161,7 +219,7 @@ def diff_graphs(base: dict, head: dict) -> dict:
         "added": added,
         "removed": removed,
         "modified": modified,
-        "unchanged": common - modified,
+        "unchanged": unchanged,
         "added_conns": added_conns,
         "removed_conns": removed_conns,
     }
@@ -169,6 +227,38 @@ def diff_graphs(base: dict, head: dict) -> dict:
 
 # ── mermaid generation ───────────────────────────────────────────────
 
+def _mermaid_init(line_color: str) -> str:
+    """Theme init directive and graph declaration, with the given edge colour."""
+    return ("%%{ init: { 'theme': 'base', 'themeVariables': { "
+            "'primaryColor': '#ffffff', "
+            "'primaryTextColor': '#1f2328', "
+            "'primaryBorderColor': '#d1d9e0', "
+            f"'lineColor': '{line_color}', "
+            "'background': '#ffffff', "
+            "'mainBkg': '#ffffff', "
+            "'fontSize': '13px'"
+            " } } }%%\n"
+            "graph LR\n")
+
+
+# Static preambles, built once at import
+_MERMAID_HEADER_PLAIN = (
+    _mermaid_init("#2da44e")
+    + "    classDef container fill:#ffffff,stroke:#2da44e,stroke-width:1.5px,color:#1f2328,rx:6,ry:6\n"
+    + "    classDef datastore fill:#ffffff,stroke:#d4a72c,stroke-width:1.5px,color:#1f2328,rx:6,ry:6\n"
+    + "    classDef other fill:#ffffff,stroke:#d1d9e0,stroke-width:1.5px,color:#1f2328,rx:6,ry:6\n"
+)
+# Class definitions for diff states
+_MERMAID_HEADER_DIFF = (
+    _mermaid_init("#656d76")
+    + "    classDef added fill:#dafbe1,stroke:#1a7f37,stroke-width:2px,color:#1a7f37,rx:6,ry:6\n"
+    + "    classDef modified fill:#fff8c5,stroke:#d4a72c,stroke-width:2px,color:#9a6700,rx:6,ry:6\n"
+    + "    classDef removed fill:#ffebe9,stroke:#d1242f,stroke-width:2px,stroke-dasharray:5 5,color:#d1242f,rx:6,ry:6\n"
+    + "    classDef unchanged fill:#ffffff,stroke:#d1d9e0,stroke-width:1px,color:#656d76,rx:6,ry:6\n"
+)
+
+
+@functools.lru_cache(maxsize=None)
 def file_diff_anchor(file_path: str) -> str:
     """Compute GitHub's PR diff anchor for a file path.
 
@@ -177,65 +267,82 @@ def file_diff_anchor(file_path: str) -> str:
     return hashlib.sha256(file_path.encode()).hexdigest()
 
 
-def make_mermaid_graph(resources: dict, connections: list,
-                      detailed: bool = False, bicep_path: str | None = None) -> str:
-    """Generate a simple Mermaid graph from resources and connections."""
-    lines = []
-    lines.append("%%{ init: { 'theme': 'base', 'themeVariables': { "
-                 "'primaryColor': '#ffffff', "
-                 "'primaryTextColor': '#1f2328', "
-                 "'primaryBorderColor': '#d1d9e0', "
-                 "'lineColor': '#2da44e', "
-                 "'background': '#ffffff', "
-                 "'mainBkg': '#ffffff', "
-                 "'fontSize': '13px'"
-                 " } } }%%")
-    lines.append("graph LR")
-    lines.append("    classDef container fill:#ffffff,stroke:#2da44e,stroke-width:1.5px,color:#1f2328,rx:6,ry:6")
-    lines.append("    classDef datastore fill:#ffffff,stroke:#d4a72c,stroke-width:1.5px,color:#1f2328,rx:6,ry:6")
-    lines.append("    classDef other fill:#ffffff,stroke:#d1d9e0,stroke-width:1.5px,color:#1f2328,rx:6,ry:6")
+@functools.lru_cache(maxsize=None)
+def _detailed_label(name: str, image: str | None, bicep_path: str | None) -> str:
+    """Detailed label with image:tag for a container node.
+
+    Cached because base and head usually share most containers unchanged.
+    """
+    from generate_architecture import make_detailed_label
+
+    detail_res = {
+        "display_name": name,
+        "symbolic_name": name,
+        "name": name,
+        "category": "container",
+        "image": image,
+    }
+    return make_detailed_label(detail_res, bicep_path)
+
+
+def _prepare(graph: dict, detailed: bool = False, bicep_path: str | None = None) -> tuple[dict, list]:
+    """Filter, label and resolve a parsed graph once for all renderers.
 
+    Returns ``nodes`` mapping resource id to ``(nid, name, label, cat)`` in
+    graph order, and ``edges`` as ``((src_id, tgt_id), s_nid, t_nid)``
+    tuples. Application resources, and edges touching them, are dropped.
+    """
+    resources = graph["resources"]
+    nodes = {}
     for rid, res in resources.items():
-        name = res.get("name", "unknown")
-        res_type = res.get("type", "")
-        cat = categorize(res_type)
+        cat = res["_cat"]
         if cat == "application":
             continue
-        nid = safe_node_id(name)
+        name = res.get("name", "unknown")
 
         if detailed and cat == "container":
-            # Build detailed label with image:tag
-            detail_res = {
-                "display_name": name,
-                "symbolic_name": name,
-                "name": name,
-                "category": cat,
-                "image": res.get("properties", {}).get("container", {}).get("image"),
-            }
-            label = make_detailed_label(detail_res, bicep_path)
+            image = res.get("properties", {}).get("container", {}).get("image")
+            label = _detailed_label(name, image, bicep_path)
         else:
             label = name
 
-        lines.append('    {}["{}"]:::{}'.format(nid, label, cat))
+        nodes[rid] = (res["_nid"], name, label, cat)
 
-    for src_id, tgt_id in connections:
-        src = resolve_name(src_id, resources)
-        tgt = resolve_name(tgt_id, resources)
-        src_res = resources.get(src_id, {})
-        tgt_res = resources.get(tgt_id, {})
-        if categorize(src_res.get("type", "")) == "application":
+    edges = []
+    for conn in graph["connections"]:
+        src_id, tgt_id = conn
+        if resources.get(src_id, {}).get("_cat", "other") == "application":
             continue
-        if categorize(tgt_res.get("type", "")) == "application":
+        if resources.get(tgt_id, {}).get("_cat", "other") == "application":
             continue
+        src = resolve_name(src_id, resources)
+        tgt = resolve_name(tgt_id, resources)
         if src != tgt:
-            lines.append("    {} --> {}".format(safe_node_id(src), safe_node_id(tgt)))
+            edges.append((conn, safe_node_id(src), safe_node_id(tgt)))
+
+    return nodes, edges
+
+
+def make_mermaid_graph(prepared: tuple[dict, list]) -> str:
+    """Generate a simple Mermaid graph from a ``_prepare``d graph."""
+    nodes, edges = prepared
+    buf = io.StringIO()
+    w = buf.write
+    w(_MERMAID_HEADER_PLAIN)
 
-    return "\n".join(lines)
+    for nid, _, label, cat in nodes.values():
+        w(f'    {nid}["{label}"]:::{cat}\n')
 
+    for _, s, t in edges:
+        w(f"    {s} --> {t}\n")
 
-def make_diff_mermaid(base: dict, head: dict, diff: dict,
+    return buf.getvalue()[:-1]  # no trailing line break
+
+
+def make_diff_mermaid(diff: dict, all_resources: dict,
+                      base_prepared: tuple[dict, list], head_prepared: tuple[dict, list],
                       repo_owner: str, repo_name: str, pr_number: str,
-                      detailed: bool = False, bicep_path: str | None = None) -> str:
+                      detailed: bool = False) -> str:
     """Generate a color-coded diff Mermaid graph.
 
     Colors:
@@ -245,37 +352,24 @@ def make_diff_mermaid(base: dict, head: dict, diff: dict,
       - Gray: unchanged
     Clicking a node opens the PR diff page anchored to the source file.
     """
-    lines = []
-    lines.append("%%{ init: { 'theme': 'base', 'themeVariables': { "
-                 "'primaryColor': '#ffffff', "
-                 "'primaryTextColor': '#1f2328', "
-                 "'primaryBorderColor': '#d1d9e0', "
-                 "'lineColor': '#656d76', "
-                 "'background': '#ffffff', "
-                 "'mainBkg': '#ffffff', "
-                 "'fontSize': '13px'"
-                 " } } }%%")
-    lines.append("graph LR")
-
-    # Class definitions for diff states
-    lines.append("    classDef added fill:#dafbe1,stroke:#1a7f37,stroke-width:2px,color:#1a7f37,rx:6,ry:6")
-    lines.append("    classDef modified fill:#fff8c5,stroke:#d4a72c,stroke-width:2px,color:#9a6700,rx:6,ry:6")
-    lines.append("    classDef removed fill:#ffebe9,stroke:#d1242f,stroke-width:2px,stroke-dasharray:5 5,color:#d1242f,rx:6,ry:6")
-    lines.append("    classDef unchanged fill:#ffffff,stroke:#d1d9e0,stroke-width:1px,color:#656d76,rx:6,ry:6")
-
-    all_resources = {**base["resources"], **head["resources"]}
+    buf = io.StringIO()
+    w = buf.write
+    w(_MERMAID_HEADER_DIFF)
+
     diff_url = f"https://github.com/{repo_owner}/{repo_name}/pull/{pr_number}/files"
 
-    all_rids = sorted(set(list(head["resources"].keys()) + list(base["resources"].keys())))
-    nodes_added = set()
+    # Head entries win, matching the precedence of all_resources
+    all_nodes = {**base_prepared[0], **head_prepared[0]}
+    edge_nids = {conn: (s, t) for conn, s, t in base_prepared[1]}
+    edge_nids.update((conn, (s, t)) for conn, s, t in head_prepared[1])
 
-    for rid in all_rids:
-        res = all_resources.get(rid, {})
-        name = res.get("name", "unknown")
-        res_type = res.get("type", "")
+    nodes_added = set()
+    # Click directives — link to PR diff page anchored to the source file + line.
+    # Collected alongside the nodes and written after the edges.
+    clicks = io.StringIO()
 
-        if categorize(res_type) == "application":
-            continue
+    for rid in sorted(all_nodes):
+        nid, name, label, cat = all_nodes[rid]
 
         if rid in diff["added"]:
             status = "added"
@@ -290,163 +384,136 @@ def make_diff_mermaid(base: dict, head: dict, diff: dict,
             status = "unchanged"
             prefix = ""
 
-        cat = categorize(res_type)
-
         if detailed and cat == "container":
-            # Build detailed label with image:tag
-            detail_res = {
-                "display_name": name,
-                "symbolic_name": name,
-                "name": name,
-                "category": cat,
-                "image": res.get("properties", {}).get("container", {}).get("image"),
-            }
-            base_label = make_detailed_label(detail_res, bicep_path)
             # Prepend the status prefix to the bold name inside the label
-            label = base_label.replace(f"<b>{name}</b>", f"<b>{prefix}{name}</b>")
+            label = label.replace(f"<b>{name}</b>", f"<b>{prefix}{name}</b>")
         else:
             label = f"{prefix}{name}"
 
-        nid = safe_node_id(name)
         if nid not in nodes_added:
-            lines.append('    {}["{}"]:::{}'.format(nid, label, status))
+            w(f'    {nid}["{label}"]:::{status}\n')
             nodes_added.add(nid)
 
-    # Edges — union of base and head connections
-    all_conns = set(head["connections"]) | set(base["connections"])
-    for src_id, tgt_id in sorted(all_conns):
-        src = resolve_name(src_id, all_resources)
-        tgt = resolve_name(tgt_id, all_resources)
-        src_res = all_resources.get(src_id, {})
-        tgt_res = all_resources.get(tgt_id, {})
-        if categorize(src_res.get("type", "")) == "application":
-            continue
-        if categorize(tgt_res.get("type", "")) == "application":
-            continue
-        if src == tgt:
-            continue
-
-        s = safe_node_id(src)
-        t = safe_node_id(tgt)
-
-        conn_tuple = (src_id, tgt_id)
-        if conn_tuple in diff.get("added_conns", set()):
-            lines.append("    {} -. new .-> {}".format(s, t))
-        elif conn_tuple in diff.get("removed_conns", set()):
-            lines.append("    {} -. removed .-> {}".format(s, t))
-        else:
-            lines.append("    {} --> {}".format(s, t))
-
-    # Click directives — link to PR diff page anchored to the source file + line
-    for rid in all_rids:
-        res = all_resources.get(rid, {})
-        name = res.get("name", "unknown")
-        if categorize(res.get("type", "")) == "application":
-            continue
-
-        nid = safe_node_id(name)
-        source_loc = res.get("sourceLocation", {})
+        source_loc = all_resources[rid].get("sourceLocation", {})
         source_file = source_loc.get("file", "")
         line = source_loc.get("line", "")
 
         if source_file:
             anchor = file_diff_anchor(source_file)
             # For removed resources, link to the left (base) side of the diff
-            if rid in diff["removed"]:
+            if status == "removed":
                 line_anchor = f"L{line}" if line else ""
             else:
                 line_anchor = f"R{line}" if line else ""
             file_url = f"{diff_url}#diff-{anchor}{line_anchor}"
             tooltip = f"{name} \u2014 {source_file} line {line}" if line else f"View diff for {name}"
-            lines.append('    click {} href "{}" "{}" _blank'.format(nid, file_url, tooltip))
+            clicks.write(f'    click {nid} href "{file_url}" "{tooltip}" _blank\n')
 
-    return "\n".join(lines)
+    # Edges — union of base and head connections, already filtered by
+    # _prepare. Sorting by the short node ids keeps the output deterministic
+    # without comparing full resource-id strings; the ids break ties.
+    for conn_tuple, (s, t) in sorted(edge_nids.items(), key=lambda e: (e[1], e[0])):
+        if conn_tuple in diff.get("added_conns", set()):
+            w(f"    {s} -. new .-> {t}\n")
+        elif conn_tuple in diff.get("removed_conns", set()):
+            w(f"    {s} -. removed .-> {t}\n")
+        else:
+            w(f"    {s} --> {t}\n")
+
+    w(clicks.getvalue())
+
+    return buf.getvalue()[:-1]  # no trailing line break
 
 
 # ── markdown rendering ──────────────────────────────────────────────
 
 def render_diff_section(app_path: str, base_graph: dict, head_graph: dict, diff: dict,
-                        repo_owner: str, repo_name: str, pr_number: str,
+                        all_resources: dict, repo_owner: str, repo_name: str, pr_number: str,
                         detailed: bool = False, bicep_path: str | None = None) -> str:
     """Render a full Markdown section for one application's diff."""
-    lines = []
+    buf = io.StringIO()
+    w = buf.write
     app_label = app_path.replace("/.radius/app-graph.json", "").replace(".radius/app-graph.json", "") or "(root)"
-    lines.append(f"### 📦 `{app_label}`\n")
+    w(f"### 📦 `{app_label}`\n\n")
 
-    has_changes = (diff["added"] or diff["removed"] or diff["modified"]
+    # Counted once; used for the early exit, the resources table and the summary
+    n_added, n_removed, n_modified, n_unchanged = map(
+        len, (diff["added"], diff["removed"], diff["modified"], diff["unchanged"]))
+    has_changes = (n_added or n_removed or n_modified
                    or diff["added_conns"] or diff["removed_conns"])
 
     if not has_changes:
-        lines.append("> No resource or connection changes.\n")
-        return "\n".join(lines)
+        w("> No resource or connection changes.\n\n")
+        return buf.getvalue()[:-1]  # no trailing line break
 
     # ── Side-by-side graphs ──
-    base_mermaid = make_mermaid_graph(base_graph["resources"], base_graph["connections"],
-                                      detailed=detailed, bicep_path=bicep_path)
-    head_mermaid = make_mermaid_graph(head_graph["resources"], head_graph["connections"],
-                                      detailed=detailed, bicep_path=bicep_path)
-
-    lines.append("<table>")
-    lines.append("<tr><th>📌 main</th><th>🔀 This PR</th></tr>")
-    lines.append("<tr><td>\n")
-    lines.append("```mermaid")
-    lines.append(base_mermaid)
-    lines.append("```")
-    lines.append("\n</td><td>\n")
-    lines.append("```mermaid")
-    lines.append(head_mermaid)
-    lines.append("```")
-    lines.append("\n</td></tr>")
-    lines.append("</table>\n")
+    # Shared by the side-by-side graphs and the diff graph
+    base_prepared = _prepare(base_graph, detailed, bicep_path)
+    head_prepared = _prepare(head_graph, detailed, bicep_path)
+    base_mermaid = make_mermaid_graph(base_prepared)
+    head_mermaid = make_mermaid_graph(head_prepared)
+
+    w("<table>\n")
+    w("<tr><th>📌 main</th><th>🔀 This PR</th></tr>\n")
+    w("<tr><td>\n\n")
+    w("```mermaid\n")
+    w(base_mermaid + "\n")
+    w("```\n")
+    w("\n</td><td>\n\n")
+    w("```mermaid\n")
+    w(head_mermaid + "\n")
+    w("```\n")
+    w("\n</td></tr>\n")
+    w("</table>\n\n")
 
     # ── Diff graph ──
-    diff_mermaid = make_diff_mermaid(base_graph, head_graph, diff,
+    diff_mermaid = make_diff_mermaid(diff, all_resources,
+                                     base_prepared, head_prepared,
                                      repo_owner, repo_name, pr_number,
-                                     detailed=detailed, bicep_path=bicep_path)
-    lines.append("#### Diff\n")
-    lines.append("🟢 Added  🟡 Modified  🔴 Removed\n")
-    lines.append("```mermaid")
-    lines.append(diff_mermaid)
-    lines.append("```\n")
+                                     detailed=detailed)
+    w("#### Diff\n\n")
+    w("🟢 Added  🟡 Modified  🔴 Removed\n\n")
+    w("```mermaid\n")
+    w(diff_mermaid + "\n")
+    w("```\n\n")
 
     # ── Resources table ──
-    if diff["added"] or diff["removed"] or diff["modified"]:
-        lines.append("#### Resources\n")
-        lines.append("| Status | Resource |")
-        lines.append("|--------|----------|")
+    if n_added or n_removed or n_modified:
+        w("#### Resources\n\n")
+        w("| Status | Resource |\n")
+        w("|--------|----------|\n")
         for rid in sorted(diff["added"]):
-            lines.append(f"| 🟢 Added | {resource_label(head_graph['resources'][rid], repo_owner, repo_name, pr_number)} |")
+            w(f"| 🟢 Added | {resource_label(head_graph['resources'][rid], repo_owner, repo_name, pr_number)} |\n")
         for rid in sorted(diff["removed"]):
-            lines.append(f"| 🔴 Removed | {resource_label(base_graph['resources'][rid], repo_owner, repo_name, pr_number)} |")
+            w(f"| 🔴 Removed | {resource_label(base_graph['resources'][rid], repo_owner, repo_name, pr_number)} |\n")
         for rid in sorted(diff["modified"]):
-            lines.append(f"| 🟡 Modified | {resource_label(head_graph['resources'][rid], repo_owner, repo_name, pr_number)} |")
-        lines.append("")
+            w(f"| 🟡 Modified | {resource_label(head_graph['resources'][rid], repo_owner, repo_name, pr_number)} |\n")
+        w("\n")
 
     # ── Connections table ──
-    all_resources = {**base_graph["resources"], **head_graph["resources"]}
     if diff["added_conns"] or diff["removed_conns"]:
-        lines.append("#### Connections\n")
-        lines.append("| Status | Connection |")
-        lines.append("|--------|------------|")
+        w("#### Connections\n\n")
+        w("| Status | Connection |\n")
+        w("|--------|------------|\n")
         for src, tgt in sorted(diff["added_conns"]):
-            lines.append(f"| 🟢 Added | {resolve_name(src, all_resources)} → {resolve_name(tgt, all_resources)} |")
+            w(f"| 🟢 Added | {resolve_name(src, all_resources)} → {resolve_name(tgt, all_resources)} |\n")
         for src, tgt in sorted(diff["removed_conns"]):
-            lines.append(f"| 🔴 Removed | {resolve_name(src, all_resources)} → {resolve_name(tgt, all_resources)} |")
-        lines.append("")
+            w(f"| 🔴 Removed | {resolve_name(src, all_resources)} → {resolve_name(tgt, all_resources)} |\n")
+        w("\n")
 
     # Summary
     summary = []
-    if diff["added"]:
-        summary.append(f"+{len(diff['added'])} added")
-    if diff["removed"]:
-        summary.append(f"-{len(diff['removed'])} removed")
-    if diff["modified"]:
-        summary.append(f"~{len(diff['modified'])} modified")
-    if diff["unchanged"]:
-        summary.append(f"{len(diff['unchanged'])} unchanged")
-    lines.append(f"*Resources: {', '.join(summary)}*\n")
+    if n_added:
+        summary.append(f"+{n_added} added")
+    if n_removed:
+        summary.append(f"-{n_removed} removed")
+    if n_modified:
+        summary.append(f"~{n_modified} modified")
+    if n_unchanged:
+        summary.append(f"{n_unchanged} unchanged")
+    w(f"*Resources: {', '.join(summary)}*\n\n")
 
-    return "\n".join(lines)
+    return buf.getvalue()[:-1]  # no trailing line break
 
 
 def render_no_changes() -> str:
@@ -483,29 +550,29 @@ def main():
         print("Error: BASE_SHA must be set.", file=sys.stderr)
         sys.exit(1)
 
-    # ── Head graph: read from the freshly generated file on disk ──
-    head_raw = None
-    if head_graph_path:
-        try:
-            with open(head_graph_path, "r") as f:
-                head_raw = f.read()
-        except FileNotFoundError:
-            print(f"Warning: HEAD_GRAPH file not found: {head_graph_path}", file=sys.stderr)
-
-    # ── Base graph: read from main's committed .radius/app-graph.json ──
-    # Find the graph path in main's tree
+    # The two reads are independent I/O, so overlap them
     base_graph_path = ".radius/app-graph.json"
-    base_raw = git_show(base_sha, base_graph_path)
-
-    if not head_raw and not base_raw:
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        # ── Base graph: read from main's committed .radius/app-graph.json ──
+        base_future = pool.submit(git_show, base_sha, base_graph_path)
+        # ── Head graph: read from the freshly generated file on disk ──
+        head_future = pool.submit(read_head_graph, head_graph_path)
+        base_raw = base_future.result()
+        head_raw = head_future.result()
+
+    # Byte-identical graphs (or none at all) cannot differ, so skip parsing,
+    # diffing and rendering entirely
+    if head_raw == base_raw or (not head_raw and not base_raw):
         result = render_no_changes()
     else:
         base_graph = parse_graph(base_raw)
         head_graph = parse_graph(head_raw)
 
         diff = diff_graphs(base_graph, head_graph)
+        # Head entries win; shared by the diff graph and connections table
+        all_resources = {**base_graph["resources"], **head_graph["resources"]}
         section = render_diff_section(
-            base_graph_path, base_graph, head_graph, diff,
+            base_graph_path, base_graph, head_graph, diff, all_resources,
             repo_owner, repo_name, pr_number,
             detailed=detailed, bicep_path=bicep_path,
         )